@@ -1,5 +1,9 @@
 # actions.py
 
+import logging
+
+logger = logging.getLogger(__name__)
+
 def archive_email(service, message_id):
     """
     Archives an email by removing the 'INBOX' label.
@@ -19,11 +23,11 @@ def archive_email(service, message_id):
             id=message_id,
             body={'removeLabelIds': ['INBOX']}
         ).execute()
-        print(f"Archived message: {message_id}")
+        logger.info("Archived message: %s", message_id)
         return f"✅ Successfully archived message."
     except Exception as e:
         error_message = f"Error archiving email: {e}"
-        print(error_message)
+        logger.exception("Error archiving message %s", message_id)
         return f"❌ {error_message}"
 
 def delete_email(service, message_id):
@@ -42,9 +46,75 @@ def delete_email(service, message_id):
     """
     try:
         service.users().messages().trash(userId='me', id=message_id).execute()
-        print(f"Deleted (trashed) message: {message_id}")
+        logger.info("Deleted (trashed) message: %s", message_id)
         return f"✅ Successfully deleted message."
     except Exception as e:
         error_message = f"Error deleting email: {e}"
-        print(error_message)
-        return f"❌ {error_message}"
\ No newline at end of file
+        logger.exception("Error deleting message %s", message_id)
+        return f"❌ {error_message}"
+
+def archive_emails_bulk(service, message_ids):
+    """
+    Archives several emails at once by removing the 'INBOX' label.
+
+    Uses `batchModify`, which updates up to 1000 messages in a single API call
+    instead of one `modify` request per email.
+
+    Args:
+        service: The authenticated Gmail API service object.
+        message_ids (list): The IDs of the emails to archive.
+
+    Returns:
+        str: A status message indicating success or failure.
+    """
+    BATCH_MODIFY_LIMIT = 1000 # Gmail API limit for batchModify.
+    try:
+        for i in range(0, len(message_ids), BATCH_MODIFY_LIMIT):
+            service.users().messages().batchModify(
+                userId='me',
+                body={'ids': message_ids[i:i + BATCH_MODIFY_LIMIT], 'removeLabelIds': ['INBOX']}
+            ).execute()
+        logger.info("Archived %d messages.", len(message_ids))
+        return f"✅ Successfully archived {len(message_ids)} messages."
+    except Exception as e:
+        error_message = f"Error archiving emails: {e}"
+        logger.exception("Error archiving %d messages", len(message_ids))
+        return f"❌ {error_message}"
+
+def delete_emails_bulk(service, message_ids):
+    """
+    Moves several emails to the trash using a single batch HTTP request.
+
+    `batchDelete` is deliberately not used because it deletes permanently; this
+    keeps the same "soft" delete behaviour as `delete_email`.
+
+    Args:
+        service: The authenticated Gmail API service object.
+        message_ids (list): The IDs of the emails to delete.
+
+    Returns:
+        str: A status message indicating success or failure.
+    """
+    BATCH_SIZE = 100 # Gmail API batch limit is 100 requests.
+    failures = []
+
+    def callback(request_id, response, exception):
+        if exception is not None:
+            failures.append(request_id)
+
+    try:
+        for i in range(0, len(message_ids), BATCH_SIZE):
+            batch = service.new_batch_http_request(callback=callback)
+            for message_id in message_ids[i:i + BATCH_SIZE]:
+                batch.add(service.users().messages().trash(userId='me', id=message_id), request_id=message_id)
+            batch.execute()
+        if failures:
+            error_message = f"Error deleting {len(failures)} of {len(message_ids)} emails."
+            logger.error("%s Failed message IDs: %s", error_message, failures)
+            return f"❌ {error_message}"
+        logger.info("Deleted (trashed) %d messages.", len(message_ids))
+        return f"✅ Successfully deleted {len(message_ids)} messages."
+    except Exception as e:
+        error_message = f"Error deleting emails: {e}"
+        logger.exception("Error deleting %d messages", len(message_ids))
+        return f"❌ {error_message}"
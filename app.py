@@ -1,21 +1,19 @@
 # app.py
 
+import asyncio
 import gradio as gr
 import base64
 import html
-import pandas as pd
+import logging
+import re
 from datetime import datetime
 
-# Force Matplotlib to use a non-interactive backend ('Agg'), which is crucial for
-# running in a server environment like Gradio to prevent rendering issues.
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-
 # Import custom modules for email handling and AI analysis.
 from email_fetcher import get_gmail_service, fetch_and_parse_emails, fetch_email_metadata
-from llm_agent import analyze_email_with_llm, find_unsubscribe_link
-from actions import archive_email, delete_email
+from llm_agent import analyze_emails_with_llm_async, find_unsubscribe_link_async
+from actions import archive_email, delete_email, archive_emails_bulk, delete_emails_bulk
+
+logger = logging.getLogger(__name__)
 
 # --- Application Constants ---
 # Defines the number of email slots to display in the UI for sifting/cleanup.
@@ -26,11 +24,31 @@ NUM_EMAILS_FOR_SIFTING = 25
 NUM_EMAILS_TO_SCAN = 40
 # The number of email metadata records to fetch for the dashboard analysis.
 NUM_EMAILS_FOR_ANALYSIS = 200
-
-
-def analyze_and_sort_emails(service, query, sort_descending, progress=gr.Progress()):
+# The number of UI components updated per email slot in each tab.
+SIFT_COMPONENTS_PER_SLOT = 6
+CLEANUP_COMPONENTS_PER_SLOT = 4
+
+# Shared updates for hiding unused email slots, built once instead of per slot.
+# Only updates without a 'value' are shared: Gradio pops 'value' out of an update
+# dict while postprocessing it, so those must stay fresh objects.
+_NO_CHANGE = gr.update()
+_HIDDEN = gr.update(visible=False)
+_EMPTY_SIFT_SLOT = (_HIDDEN, _NO_CHANGE, _NO_CHANGE, _NO_CHANGE, _HIDDEN, _NO_CHANGE)
+
+# Keywords used as a simple heuristic to identify potential promotional emails.
+PROMO_KEYWORDS = ['newsletter', 'promotion', 'deals', 'sale', 'weekly', 'daily', 'update', 'exclusive', 'offer', 'unsubscribe']
+# All keywords compiled into one case-insensitive pattern, so each text is scanned
+# in a single pass without allocating a lowercased copy.
+_PROMO_RE = re.compile('|'.join(map(re.escape, PROMO_KEYWORDS)), re.IGNORECASE)
+# HTML card for one unsubscribeable email, filled in with str.format().
+_UNSUB_CARD_TEMPLATE = ("<div style='display: flex; justify-content: space-between; align-items: center; border: 1px solid #e0e0e0; border-radius: 8px; padding: 10px 15px; margin-bottom: 10px;'>"
+                        "<div><strong style='font-size: 1.1em;'>{sender}</strong><br><span style='color: #888;'>Subject: {subject}</span></div>"
+                        "<a href='{link}' target='_blank' style='text-decoration: none; background-color: #ff4b4b; color: white; padding: 8px 12px; border-radius: 5px; font-weight: bold; white-space: nowrap;'>Unsubscribe</a></div>")
+
+
+async def analyze_and_sort_emails(service, query, sort_descending, progress=gr.Progress()):
     """
-    Fetches emails, analyzes each with an LLM for priority, and sorts them.
+    Fetches emails, analyzes them in concurrent batches with an LLM for priority, and sorts them.
 
     Args:
         service: Authenticated Gmail service object.
@@ -42,35 +60,39 @@ def analyze_and_sort_emails(service, query, sort_descending, progress=gr.Progres
         list: A sorted list of analyzed email dictionaries.
     """
     progress(0, desc="Fetching emails to analyze...")
-    emails_to_scan = fetch_and_parse_emails(service, max_results=NUM_EMAILS_FOR_SIFTING, query_string=f'in:inbox {query}')
+    # Run the blocking Gmail fetch in a worker thread so the event loop stays responsive.
+    emails_to_scan = await asyncio.to_thread(fetch_and_parse_emails, service, max_results=NUM_EMAILS_FOR_SIFTING, query_string=f'in:inbox {query}')
     if not emails_to_scan:
         return []
 
+    progress(0.3, desc=f"Analyzing priority of {len(emails_to_scan)} emails...")
+    # Emails are analyzed several per prompt, with all batches sent concurrently.
+    results = await analyze_emails_with_llm_async([email['body'] for email in emails_to_scan], [email['headers'] for email in emails_to_scan])
+
     analyzed_emails = []
-    total_emails = len(emails_to_scan)
-    for i, email in enumerate(emails_to_scan):
-        progress(i / total_emails, desc=f"Analyzing priority of email {i+1}/{total_emails}...")
-        analysis = analyze_email_with_llm(email['body'])
+    for email, analysis in zip(emails_to_scan, results):
         # Only include emails that were successfully analyzed and have a priority score.
-        if analysis and 'priority' in analysis:
+        if isinstance(analysis, dict) and 'priority' in analysis:
             email['analysis'] = analysis
             analyzed_emails.append(email)
         else:
-            print(f"Skipping email {email['id']} due to analysis failure.")
+            logger.warning("Skipping email %s due to analysis failure.", email['id'])
 
     # Sort emails based on the 'priority' score from the LLM analysis.
     return sorted(analyzed_emails, key=lambda e: e['analysis']['priority'], reverse=sort_descending)
 
 
-def fetch_and_update_sift_ui(service, progress=gr.Progress()):
+async def fetch_and_update_sift_ui(service, progress=gr.Progress()):
     """
     Fetches the highest-priority unread emails and generates Gradio UI updates.
     """
-    sorted_emails = analyze_and_sort_emails(service, query="is:unread", sort_descending=True, progress=progress)
+    sorted_emails = await analyze_and_sort_emails(service, query="is:unread", sort_descending=True, progress=progress)
 
-    updates = []
+    # Preallocate one entry per component and fill it slot by slot.
+    updates = [None] * (MAX_EMAILS * SIFT_COMPONENTS_PER_SLOT)
     # This loop generates a list of gr.update() objects to modify the UI components.
     for i in range(MAX_EMAILS):
+        slot = slice(i * SIFT_COMPONENTS_PER_SLOT, (i + 1) * SIFT_COMPONENTS_PER_SLOT)
         if i < len(sorted_emails):
             email = sorted_emails[i]
             analysis = email['analysis']
@@ -78,29 +100,30 @@ def fetch_and_update_sift_ui(service, progress=gr.Progress()):
             card_content = (f"**Priority:** {analysis.get('priority', 'N/A')}/10 | "
                             f"**Category:** `{analysis.get('category', 'N/A')}`\n"
                             f"**Summary:** *{analysis.get('summary', 'N/A')}*")
-            # Each extend call adds updates for one email slot's components.
-            updates.extend([
+            # Each assignment fills the updates for one email slot's components.
+            updates[slot] = (
                 gr.update(label=f"📧 {subject}", visible=True), # Accordion
                 gr.update(value=card_content),                # Markdown content
                 gr.update(value=email['id']),                 # Hidden Textbox for ID
                 gr.update(value=f"## {subject}\n\n---\n\n{email['body']}", visible=False), # Hidden full body
                 gr.update(visible=True),                      # Read button
                 gr.update(value="")                           # Status Textbox
-            ])
+            )
         else:
             # If there are fewer emails than slots, hide the extra slots.
-            updates.extend([gr.update(visible=False), gr.update(), gr.update(), gr.update(), gr.update(visible=False), gr.update()])
+            updates[slot] = _EMPTY_SIFT_SLOT
     return updates
 
 
-def fetch_and_display_low_priority_read(service, progress=gr.Progress()):
+async def fetch_and_display_low_priority_read(service, progress=gr.Progress()):
     """
     Fetches the lowest-priority read emails and generates Gradio UI updates.
     """
-    sorted_emails = analyze_and_sort_emails(service, query="is:read", sort_descending=False, progress=progress)
+    sorted_emails = await analyze_and_sort_emails(service, query="is:read", sort_descending=False, progress=progress)
 
-    updates = []
+    updates = [None] * (MAX_EMAILS * CLEANUP_COMPONENTS_PER_SLOT)
     for i in range(MAX_EMAILS):
+        slot = slice(i * CLEANUP_COMPONENTS_PER_SLOT, (i + 1) * CLEANUP_COMPONENTS_PER_SLOT)
         if i < len(sorted_emails):
             email = sorted_emails[i]
             analysis = email['analysis']
@@ -108,50 +131,137 @@ def fetch_and_display_low_priority_read(service, progress=gr.Progress()):
             card_content = (f"**Priority:** {analysis.get('priority', 'N/A')}/10 | "
                             f"**Category:** `{analysis.get('category', 'N/A')}`\n"
                             f"**Summary:** *{analysis.get('summary', 'N/A')}*")
-            updates.extend([
+            updates[slot] = (
                 gr.update(label=f"🗑️ {subject}", visible=True), # Accordion
                 gr.update(value=card_content),                # Markdown content
                 gr.update(value=email['id']),                 # Hidden Textbox for ID
                 gr.update(value="")                           # Status Textbox
-            ])
+            )
         else:
-            updates.extend([gr.update(visible=False), gr.update(), gr.update(), gr.update()])
+            # Clear the ID as well so "Archive All" never picks up an email from a previous scan.
+            updates[slot] = (_HIDDEN, _NO_CHANGE, gr.update(value=""), _NO_CHANGE)
     return updates
 
 
-def find_and_display_all_unsubscribeable(service, progress=gr.Progress()):
+def _looks_promotional(email):
+    """
+    Returns True if an email's subject or body contains a promotional keyword.
+
+    The short subject is checked first so the (often large) body is only scanned
+    when the subject has no match.
+    """
+    if _PROMO_RE.search(email['subject']):
+        return True
+    return _PROMO_RE.search(email['body']) is not None
+
+
+async def find_and_display_all_unsubscribeable(service, progress=gr.Progress()):
     """
     Scans recent emails for unsubscribe links and displays them as HTML cards.
     """
     if not service: return "Authentication failed. Please restart the app."
 
     progress(0, desc="Fetching recent emails...")
-    emails_to_scan = fetch_and_parse_emails(service, max_results=NUM_EMAILS_TO_SCAN, query_string='in:inbox')
+    emails_to_scan = await asyncio.to_thread(fetch_and_parse_emails, service, max_results=NUM_EMAILS_TO_SCAN, query_string='in:inbox')
     if not emails_to_scan: return "Could not find any emails to scan."
 
+    # Uses a simple heuristic to identify potential promotional emails before a deeper scan.
+    promo_candidates = [email for email in emails_to_scan if _looks_promotional(email)]
+    if not promo_candidates: return "No emails with unsubscribe links found in your recent inbox!"
+
+    total_emails = len(promo_candidates)
+    completed = 0
+
+    # LLM concurrency is capped inside llm_agent, so every scan can be started at once.
+    async def scan_with_progress(email):
+        nonlocal completed
+        unsub_link = await find_unsubscribe_link_async(email['headers'], email['body'])
+        completed += 1
+        progress(completed / total_emails, desc=f"Scanned {completed}/{total_emails} emails for unsubscribe links...")
+        return unsub_link
+
+    unsub_links = await asyncio.gather(*(scan_with_progress(email) for email in promo_candidates))
+
     found_emails_html = []
-    total_emails = len(emails_to_scan)
-    for i, email in enumerate(emails_to_scan):
-        progress(i / total_emails, desc=f"Scanning email {i+1}/{total_emails} from {email['sender']}")
-        # Uses a simple heuristic to identify potential promotional emails before a deeper scan.
-        promo_keywords = ['newsletter', 'promotion', 'deals', 'sale', 'weekly', 'daily', 'update', 'exclusive', 'offer', 'unsubscribe']
-        if any(keyword in email['subject'].lower() for keyword in promo_keywords) or any(keyword in email['body'].lower() for keyword in promo_keywords):
-            unsub_link = find_unsubscribe_link(email['headers'], email['body'])
-            if unsub_link:
-                safe_sender = html.escape(email['sender'])
-                safe_subject = html.escape(email['subject'])
-                card_html = f"<div style='display: flex; justify-content: space-between; align-items: center; border: 1px solid #e0e0e0; border-radius: 8px; padding: 10px 15px; margin-bottom: 10px;'><div><strong style='font-size: 1.1em;'>{safe_sender}</strong><br><span style='color: #888;'>Subject: {safe_subject}</span></div><a href='{unsub_link}' target='_blank' style='text-decoration: none; background-color: #ff4b4b; color: white; padding: 8px 12px; border-radius: 5px; font-weight: bold; white-space: nowrap;'>Unsubscribe</a></div>"
-                found_emails_html.append(card_html)
+    for email, unsub_link in zip(promo_candidates, unsub_links):
+        if unsub_link:
+            found_emails_html.append(_UNSUB_CARD_TEMPLATE.format(
+                sender=html.escape(email['sender']),
+                subject=html.escape(email['subject']),
+                link=html.escape(unsub_link)
+            ))
 
     if not found_emails_html: return "No emails with unsubscribe links found in your recent inbox!"
     return f"<h3>Found {len(found_emails_html)} emails with unsubscribe links:</h3>" + "".join(found_emails_html)
 
 
+def _run_cleanup_bulk_action(bulk_action, service, message_ids):
+    """
+    Applies a bulk action to every email listed in the cleanup slots.
+
+    Returns the status message followed by updates for every slot's accordion and
+    then every slot's ID holder. The slots are hidden and their IDs cleared only
+    if the action succeeded, so an email can't be acted on twice.
+    """
+    ids = [message_id for message_id in message_ids if message_id]
+    if not ids:
+        return ["No emails to clean up."] + [_NO_CHANGE] * (2 * MAX_EMAILS)
+    status = bulk_action(service, ids)
+    if status.startswith("❌"):
+        return [status] + [_NO_CHANGE] * (2 * MAX_EMAILS)
+    # Each ID update carries a 'value', so it must be a fresh dict (see _NO_CHANGE above).
+    return [status] + [_HIDDEN] * MAX_EMAILS + [gr.update(value="") for _ in range(MAX_EMAILS)]
+
+def archive_all_cleanup_emails(service, *message_ids):
+    """
+    Archives every email currently listed in the cleanup slots with one API call.
+    """
+    return _run_cleanup_bulk_action(archive_emails_bulk, service, message_ids)
+
+def delete_all_cleanup_emails(service, *message_ids):
+    """
+    Moves every email currently listed in the cleanup slots to the trash in one batch request.
+    """
+    return _run_cleanup_bulk_action(delete_emails_bulk, service, message_ids)
+
+
 # --- Dashboard Plotting Functions ---
 
-def plot_top_senders(df, ax):
-    """Plots the top 10 email senders on a given Matplotlib axis."""
-    top_senders = df['sender_email'].value_counts().nlargest(10)
+def _get_pyplot():
+    """
+    Imports and returns matplotlib.pyplot on first use.
+
+    Matplotlib is only needed by the dashboard, so importing it lazily keeps it
+    out of the app's startup time.
+    """
+    import matplotlib
+    # Force Matplotlib to use a non-interactive backend ('Agg'), which is crucial for
+    # running in a server environment like Gradio to prevent rendering issues.
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+# The dashboard figure is created once and redrawn on every click, rather than
+# allocating (and leaking) a new Figure per request.
+_DASH_FIG, _DASH_AXES = None, None
+
+def _get_dashboard_figure():
+    """Returns the shared 2x2 dashboard figure and axes, cleared for a fresh draw."""
+    global _DASH_FIG, _DASH_AXES
+    if _DASH_FIG is None:
+        plt = _get_pyplot()
+        plt.style.use('seaborn-v0_8-whitegrid')
+        _DASH_FIG, _DASH_AXES = plt.subplots(2, 2, figsize=(18, 11))
+    else:
+        # Rebuild the axes rather than ax.cla(): pandas keeps per-axes plot state
+        # (ax._plot_data) that cla() doesn't reset, so it would grow on every draw.
+        _DASH_FIG.clf()
+        _DASH_AXES = _DASH_FIG.subplots(2, 2)
+    return _DASH_FIG, _DASH_AXES
+
+def plot_top_senders(sender_counts, ax):
+    """Plots the top 10 email senders on a given Matplotlib axis from precomputed sender counts."""
+    top_senders = sender_counts.nlargest(10)
     if not top_senders.empty:
         top_senders.sort_values().plot(kind='barh', ax=ax, color='skyblue')
         ax.set_title("Top 10 Senders by Volume", fontsize=14)
@@ -160,10 +270,10 @@ def plot_top_senders(df, ax):
         ax.text(0.5, 0.5, "No sender data to plot.", ha='center', va='center', color='gray')
     ax.grid(True, linestyle='--', alpha=0.6)
 
-def plot_hourly_distribution(df, ax):
-    """Plots the distribution of received emails by hour of the day."""
-    if not df.empty and 'hour' in df.columns:
-        hourly_counts = df['hour'].value_counts().sort_index()
+def plot_hourly_distribution(hour_counts, ax):
+    """Plots the distribution of received emails by hour of the day from precomputed hour counts."""
+    if not hour_counts.empty:
+        hourly_counts = hour_counts.sort_index()
         hourly_counts.plot(kind='bar', ax=ax, color='coral')
         ax.set_title("Emails by Hour of Day", fontsize=14)
         ax.set_xlabel("Hour (24-hour format)", fontsize=12)
@@ -173,9 +283,9 @@ def plot_hourly_distribution(df, ax):
         ax.text(0.5, 0.5, "No hourly data to plot.", ha='center', va='center', color='gray')
     ax.grid(True, axis='y', linestyle='--', alpha=0.6)
 
-def plot_top_domains(df, ax):
-    """Plots the top 10 sender domains on a given Matplotlib axis."""
-    top_domains = df['sender_domain'].value_counts().nlargest(10)
+def plot_top_domains(domain_counts, ax):
+    """Plots the top 10 sender domains on a given Matplotlib axis from precomputed domain counts."""
+    top_domains = domain_counts.nlargest(10)
     if not top_domains.empty:
         top_domains.sort_values().plot(kind='barh', ax=ax, color='mediumseagreen')
         ax.set_title("Top 10 Sender Domains", fontsize=14)
@@ -193,7 +303,7 @@ def plot_daily_volume(df, ax):
         ax.set_title("Daily Email Volume", fontsize=14)
         ax.set_ylabel("Number of Emails", fontsize=12)
         ax.set_xlabel("Date", fontsize=12)
-        plt.setp(ax.get_xticklabels(), rotation=30, ha='right')
+        _get_pyplot().setp(ax.get_xticklabels(), rotation=30, ha='right')
     else:
         ax.text(0.5, 0.5, "No daily volume data found.", ha='center', va='center', color='gray')
     ax.grid(True, linestyle='--', alpha=0.7)
@@ -203,8 +313,7 @@ def generate_dashboard(service, start_date_str, end_date_str, progress=gr.Progre
     """
     Generates a 2x2 dashboard of email statistics and a summary report.
     """
-    fig, axes = plt.subplots(2, 2, figsize=(18, 11))
-    plt.style.use('seaborn-v0_8-whitegrid')
+    fig, axes = _get_dashboard_figure()
     all_axes = axes.flatten()
 
     # Validate the date strings from the Textbox inputs.
@@ -216,14 +325,14 @@ def generate_dashboard(service, start_date_str, end_date_str, progress=gr.Progre
         report_text = "❌ Invalid date format. Please use YYYY-MM-DD."
         [ax.axis('off') for ax in all_axes] # Hide axes on error
         all_axes[0].text(0.5, 0.5, "Invalid Date Format", ha='center', va='center', color='red')
-        plt.tight_layout()
+        fig.tight_layout()
         return fig, report_text
 
     if not service:
         report_text = "Authentication failed. Please restart the app."
         [ax.axis('off') for ax in all_axes]
         all_axes[0].text(0.5, 0.5, "Authentication Failed", ha='center', va='center')
-        plt.tight_layout()
+        fig.tight_layout()
         return fig, report_text
 
     progress(0.2, desc="Fetching email metadata...")
@@ -233,24 +342,29 @@ def generate_dashboard(service, start_date_str, end_date_str, progress=gr.Progre
         report_text = "Could not find any email data for the selected criteria."
         [ax.axis('off') for ax in all_axes]
         all_axes[0].text(0.5, 0.5, "No Email Data Found", ha='center', va='center', color='gray')
-        plt.tight_layout()
+        fig.tight_layout()
         return fig, report_text
 
     progress(0.6, desc="Analyzing data and creating plots...")
+    # Count each column once and share the results between the plots and the report.
+    sender_counts = df['sender_email'].value_counts()
+    domain_counts = df['sender_domain'].value_counts()
+    hour_counts = df['hour'].value_counts()
+
     # Populate the 2x2 grid with plots.
-    plot_top_senders(df, axes[0, 0])
-    plot_hourly_distribution(df, axes[0, 1])
-    plot_top_domains(df, axes[1, 0])
+    plot_top_senders(sender_counts, axes[0, 0])
+    plot_hourly_distribution(hour_counts, axes[0, 1])
+    plot_top_domains(domain_counts, axes[1, 0])
     plot_daily_volume(df, axes[1, 1])
 
     # Generate a dynamic summary report based on the data.
     report_text = (f"✅ Analysis complete! Scanned **{len(df)}** emails in the selected range.\n"
-                   f"- Your most frequent sender is **{df['sender_email'].value_counts().index[0]}**.\n"
-                   f"- The busiest company domain is **{df['sender_domain'].value_counts().index[0]}**.\n"
-                   f"- You receive the most emails during the **{df['hour'].value_counts().idxmax()}:00 hour**.")
+                   f"- Your most frequent sender is **{sender_counts.index[0]}**.\n"
+                   f"- The busiest company domain is **{domain_counts.index[0]}**.\n"
+                   f"- You receive the most emails during the **{hour_counts.idxmax()}:00 hour**.")
     
     # Adjust subplot params for a tight layout.
-    plt.tight_layout(pad=3.0)
+    fig.tight_layout(pad=3.0)
     return fig, report_text
 
 
@@ -300,6 +414,8 @@ with gr.Blocks(title="InboxIQ", theme=gr.themes.Soft()) as demo:
                 cleanup_button = gr.Button("🔍 Find Low-Priority Emails to Delete")
 
             cleanup_all_outputs = []
+            # Collected separately so the "Archive All" button can act on every slot.
+            cleanup_accordions, cleanup_id_holders = [], []
             for i in range(MAX_EMAILS):
                 with gr.Accordion(f"Cleanup Slot {i+1}", visible=False) as cleanup_accordion:
                     cleanup_content_md = gr.Markdown()
@@ -309,13 +425,25 @@ with gr.Blocks(title="InboxIQ", theme=gr.themes.Soft()) as demo:
                         cleanup_delete_btn = gr.Button("Delete", variant="stop")
                     cleanup_status_text = gr.Textbox(label="Status", interactive=False)
 
-                    cleanup_archive_btn.click(fn=archive_email, inputs=[service_state, cleanup_id_holder], outputs=[cleanup_status_text]).then(lambda: gr.update(visible=False), outputs=[cleanup_accordion])
-                    cleanup_delete_btn.click(fn=delete_email, inputs=[service_state, cleanup_id_holder], outputs=[cleanup_status_text]).then(lambda: gr.update(visible=False), outputs=[cleanup_accordion])
+                    # Clearing the ID keeps "Archive All"/"Delete All" from acting on an email already handled here.
+                    cleanup_archive_btn.click(fn=archive_email, inputs=[service_state, cleanup_id_holder], outputs=[cleanup_status_text]).then(lambda: (gr.update(visible=False), gr.update(value="")), outputs=[cleanup_accordion, cleanup_id_holder])
+                    cleanup_delete_btn.click(fn=delete_email, inputs=[service_state, cleanup_id_holder], outputs=[cleanup_status_text]).then(lambda: (gr.update(visible=False), gr.update(value="")), outputs=[cleanup_accordion, cleanup_id_holder])
 
                     cleanup_all_outputs.extend([cleanup_accordion, cleanup_content_md, cleanup_id_holder, cleanup_status_text])
+                    cleanup_accordions.append(cleanup_accordion)
+                    cleanup_id_holders.append(cleanup_id_holder)
 
             cleanup_button.click(fn=fetch_and_display_low_priority_read, inputs=[service_state], outputs=cleanup_all_outputs, show_progress="full")
 
+            with gr.Row():
+                cleanup_archive_all_btn = gr.Button("📦 Archive All")
+                cleanup_delete_all_btn = gr.Button("🗑️ Delete All", variant="stop")
+            cleanup_bulk_status_text = gr.Textbox(label="Status", interactive=False)
+            # The bulk actions also hide every slot and clear its ID once they succeed.
+            cleanup_bulk_outputs = [cleanup_bulk_status_text] + cleanup_accordions + cleanup_id_holders
+            cleanup_archive_all_btn.click(fn=archive_all_cleanup_emails, inputs=[service_state] + cleanup_id_holders, outputs=cleanup_bulk_outputs)
+            cleanup_delete_all_btn.click(fn=delete_all_cleanup_emails, inputs=[service_state] + cleanup_id_holders, outputs=cleanup_bulk_outputs)
+
         # --- TAB 3: Unsubscribe Finder ---
         with gr.TabItem("🔎 Unsubscribe Finder"):
             with gr.Row():
@@ -340,4 +468,6 @@ with gr.Blocks(title="InboxIQ", theme=gr.themes.Soft()) as demo:
     demo.load(fn=get_gmail_service, outputs=[service_state])
 
 if __name__ == "__main__":
+    # Show the app's progress and error messages on the console.
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
     demo.launch()
\ No newline at end of file
@@ -1,24 +1,66 @@
 # email_fetcher.py
 
 import os.path
-import base64
+import binascii
+import logging
 import re
-import pandas as pd
-from bs4 import BeautifulSoup
+import threading
+import time
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+
+logger = logging.getLogger(__name__)
+
+# Heavier libraries (pandas, selectolax, googleapiclient, httplib2) are imported
+# inside the functions that use them to keep app startup fast.
 
 # Define the scope of access needed for the Gmail API.
 SCOPES = ['https://mail.google.com/']
 
+# Partial-response mask for full message fetches: only the fields parsed below are
+# returned, so attachment payloads are never downloaded.
+_MESSAGE_FIELDS = 'id,payload(headers,mimeType,body/data,parts(mimeType,body/data))'
+
+# Translation table from URL-safe base64 (used by the Gmail API) to standard base64.
+_URLSAFE_TR = bytes.maketrans(b'-_', b'+/')
+
+# Matches the address part of a 'From' header (e.g., "Sender Name <sender@example.com>").
+_FROM_RE = re.compile(r'<([^>]+)>')
+
+# The Gmail service is built once and reused across Gradio callbacks.
+_gmail_service = None
+# httplib2.Http is not thread-safe, so each worker thread gets its own authorized
+# connection, which it then reuses for all of its requests.
+_thread_local = threading.local()
+
+def _thread_http(creds):
+    """Returns the calling thread's AuthorizedHttp, creating it on first use."""
+    import httplib2
+    import google_auth_httplib2
+
+    authed_http = getattr(_thread_local, 'authed_http', None)
+    if authed_http is None:
+        authed_http = google_auth_httplib2.AuthorizedHttp(creds, http=httplib2.Http(timeout=30))
+        _thread_local.authed_http = authed_http
+    return authed_http
+
 def get_gmail_service():
     """
     Authenticates with the Gmail API and returns a service object.
 
-    Handles token creation, storage (in token.json), and renewal.
+    Handles token creation, storage (in token.json), and renewal. The service is
+    cached at module level and is safe to share across Gradio worker threads:
+    every request it builds is sent over the calling thread's own keep-alive
+    connection instead of paying a new TCP/TLS handshake.
     """
+    global _gmail_service
+    if _gmail_service is not None:
+        return _gmail_service
+
     creds = None
     # The file token.json stores the user's access and refresh tokens.
     if os.path.exists('token.json'):
@@ -35,7 +77,89 @@ def get_gmail_service():
         with open('token.json', 'w') as token:
             token.write(creds.to_json())
 
-    return build('gmail', 'v1', credentials=creds)
+    from googleapiclient.discovery import build
+    from googleapiclient.http import HttpRequest
+
+    # Bind each request to the thread that builds it; expired tokens are still
+    # refreshed automatically by AuthorizedHttp.
+    def build_request(http, *args, **kwargs):
+        return HttpRequest(_thread_http(creds), *args, **kwargs)
+
+    # cache_discovery=False skips the discovery-document file cache lookup on startup.
+    _gmail_service = build('gmail', 'v1', http=_thread_http(creds), requestBuilder=build_request, cache_discovery=False)
+    return _gmail_service
+
+def _decode_body(data):
+    """
+    Decodes a base64url-encoded message body part to text.
+
+    Calls binascii directly instead of going through base64.urlsafe_b64decode.
+    Extra '=' padding is appended because Gmail sometimes omits it and
+    binascii ignores any excess.
+    """
+    raw = binascii.a2b_base64(data.encode('ascii').translate(_URLSAFE_TR) + b'===')
+    return raw.decode('utf-8', errors='ignore')
+
+@lru_cache(maxsize=64)
+def _html_to_text(html_content):
+    """
+    Converts an HTML email body to plain text.
+
+    Links are kept as 'link text (url)', so unsubscribe links in HTML-only emails
+    can still be found in the text. Uses selectolax's C-based Lexbor parser, and caches
+    results because newsletter templates are often repeated verbatim across emails.
+    """
+    from selectolax.lexbor import LexborHTMLParser
+
+    tree = LexborHTMLParser(html_content)
+    # Drop non-visible content so it doesn't end up in the extracted text.
+    tree.strip_tags(['style', 'script'])
+    for anchor in tree.css('a[href]'):
+        anchor.replace_with(f"{anchor.text()} ({anchor.attributes.get('href')})")
+    root = tree.body or tree.root
+    return root.text(separator='\n') if root else ''
+
+# Message-ID lists for dashboard queries, keyed by (query_string, max_emails), so
+# regenerating the dashboard for the same date range skips the list() round-trip.
+LIST_CACHE_TTL_SECONDS = 300
+LIST_CACHE_MAX_ENTRIES = 32
+_list_cache = {}
+
+def _list_message_ids_cached(service, query_string, max_emails):
+    """
+    Returns the message list for a query, reusing a recent result when available.
+
+    Entries expire after LIST_CACHE_TTL_SECONDS so newly arrived mail is picked up.
+    """
+    key = (query_string, max_emails)
+    cached = _list_cache.get(key)
+    if cached and time.monotonic() - cached[0] < LIST_CACHE_TTL_SECONDS:
+        return cached[1]
+
+    results = service.users().messages().list(userId='me', q=query_string, maxResults=max_emails).execute()
+    messages = results.get('messages', [])
+    # Evict the oldest entry once the cache is full (dicts keep insertion order).
+    _list_cache.pop(key, None)
+    if len(_list_cache) >= LIST_CACHE_MAX_ENTRIES:
+        _list_cache.pop(next(iter(_list_cache)))
+    _list_cache[key] = (time.monotonic(), messages)
+    return messages
+
+def _parse_email_date(date_header):
+    """
+    Parses an RFC 2822 'Date' header into a UTC datetime.
+
+    This is much faster than letting pandas fall back to dateutil for each row.
+    Returns None for missing or malformed dates.
+    """
+    try:
+        parsed = parsedate_to_datetime(date_header)
+    except (TypeError, ValueError, IndexError):
+        return None
+    # Headers with a '-0000' zone parse as naive datetimes; treat them as UTC.
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
 
 def fetch_email_metadata(service, max_emails=200, start_date=None, end_date=None):
     """
@@ -53,6 +177,8 @@ def fetch_email_metadata(service, max_emails=200, start_date=None, end_date=None
     Returns:
         pd.DataFrame: A DataFrame with email metadata, or an empty DataFrame on error.
     """
+    import pandas as pd
+
     # Build the Gmail API query string based on the provided date range.
     query_parts = ['in:inbox']
     if start_date:
@@ -61,16 +187,16 @@ def fetch_email_metadata(service, max_emails=200, start_date=None, end_date=None
         query_parts.append(f"before:{end_date.strftime('%Y/%m/%d')}")
     query_string = " ".join(query_parts)
 
-    print(f"Fetching metadata for up to {max_emails} emails with query: '{query_string}'")
+    logger.info("Fetching metadata for up to %d emails with query: '%s'", max_emails, query_string)
 
     try:
-        # First, get a list of message IDs that match the query.
-        results = service.users().messages().list(userId='me', q=query_string, maxResults=max_emails).execute()
-        messages = results.get('messages', [])
+        # First, get a list of message IDs that match the query (cached briefly per query).
+        messages = _list_message_ids_cached(service, query_string, max_emails)
         if not messages:
             return pd.DataFrame()
 
-        email_data = []
+        # Collect each field into its own list so the DataFrame is built column-wise.
+        senders, dates = [], []
         BATCH_SIZE = 100 # Gmail API batch limit is 100 requests.
 
         # Define a callback function to process the result of each request in the batch.
@@ -79,29 +205,32 @@ def fetch_email_metadata(service, max_emails=200, start_date=None, end_date=None
                 headers = response['payload']['headers']
                 sender = next((h['value'] for h in headers if h['name'].lower() == 'from'), 'N/A')
                 date = next((h['value'] for h in headers if h['name'].lower() == 'date'), 'N/A')
-                email_data.append({'sender': sender, 'date': date})
+                senders.append(sender)
+                dates.append(date)
 
         # Process message IDs in chunks of BATCH_SIZE.
         for i in range(0, len(messages), BATCH_SIZE):
             message_chunk = messages[i:i + BATCH_SIZE]
             # Create a new batch request object.
             batch = service.new_batch_http_request(callback=callback)
-            print(f"Preparing batch for emails {i+1} to {i+len(message_chunk)}...")
+            logger.debug("Preparing batch for emails %d to %d...", i + 1, i + len(message_chunk))
             for message_info in message_chunk:
-                # Add a GET request for each message's metadata to the batch.
-                batch.add(service.users().messages().get(userId='me', id=message_info['id'], format='metadata'))
+                # Add a GET request for each message's metadata to the batch, limited to
+                # the only headers the dashboard reads to keep responses small.
+                batch.add(service.users().messages().get(userId='me', id=message_info['id'], format='metadata', metadataHeaders=['From', 'Date']))
             batch.execute()
 
-        if not email_data:
+        if not senders:
             return pd.DataFrame()
 
         # Convert the collected data into a pandas DataFrame for easy analysis.
-        df = pd.DataFrame(email_data)
+        df = pd.DataFrame({'sender': senders, 'date': dates})
         # Extract the clean email address from the 'From' header (e.g., from "Sender Name <sender@example.com>").
-        df['sender_email'] = df['sender'].apply(lambda x: re.search(r'<(.+?)>', x).group(1) if re.search(r'<(.+?)>', x) else x)
+        # A single vectorized extract replaces the per-row regex; bare addresses are kept as-is.
+        df['sender_email'] = df['sender'].str.extract(_FROM_RE, expand=False).fillna(df['sender'])
 
         # Process date and extract features needed for the dashboard plots.
-        df['date'] = pd.to_datetime(df['date'], errors='coerce', utc=True)
+        df['date'] = pd.to_datetime([_parse_email_date(d) for d in df['date']], errors='coerce', utc=True)
         df.dropna(subset=['date'], inplace=True) # Drop rows where date parsing failed.
         df['sender_domain'] = df['sender_email'].str.split('@').str[1]
         df['hour'] = df['date'].dt.hour
@@ -109,8 +238,8 @@ def fetch_email_metadata(service, max_emails=200, start_date=None, end_date=None
 
         return df
 
-    except Exception as e:
-        print(f"An error occurred while fetching email metadata: {e}")
+    except Exception:
+        logger.exception("An error occurred while fetching email metadata")
         return pd.DataFrame()
 
 def fetch_and_parse_emails(service, max_results=50, query_string='in:inbox'):
@@ -128,22 +257,29 @@ def fetch_and_parse_emails(service, max_results=50, query_string='in:inbox'):
     Returns:
         list: A list of parsed email dictionaries, or an empty list on error.
     """
-    print(f"Fetching last {max_results} emails with query: '{query_string}'...")
+    logger.info("Fetching last %d emails with query: '%s'...", max_results, query_string)
     try:
         results = service.users().messages().list(userId='me', q=query_string, maxResults=max_results).execute()
         messages = results.get('messages', [])
-        parsed_emails = []
         if not messages:
             return []
 
-        for message_info in messages:
-            msg = service.users().messages().get(userId='me', id=message_info['id']).execute()
-            payload = msg['payload']
+        parsed_emails = []
+        BATCH_SIZE = 100 # Gmail API batch limit is 100 requests.
+        # Map each message ID to its position so the list order can be restored after batching.
+        message_order = {message_info['id']: i for i, message_info in enumerate(messages)}
+
+        # Define a callback function to parse each full message returned in the batch.
+        def callback(request_id, response, exception):
+            if exception is not None:
+                logger.warning("Failed to fetch message %s: %s", request_id, exception)
+                return
+            payload = response['payload']
             headers = payload['headers']
 
             # Extract key metadata from headers.
             from_header = next((h['value'] for h in headers if h['name'].lower() == 'from'), '')
-            sender_match = re.search(r'<(.+?)>', from_header)
+            sender_match = _FROM_RE.search(from_header)
             sender = sender_match.group(1) if sender_match else from_header
             subject = next((h['value'] for h in headers if h['name'].lower() == 'subject'), 'No Subject')
 
@@ -152,26 +288,37 @@ def fetch_and_parse_emails(service, max_results=50, query_string='in:inbox'):
             if 'parts' in payload:
                 # This logic handles multipart emails.
                 part = next((p for p in payload['parts'] if p.get('mimeType') == 'text/plain'), None)
-                if part and 'data' in part['body']:
+                if part and 'data' in part.get('body', {}):
                     data = part['body'].get('data', '')
-                    body = base64.urlsafe_b64decode(data).decode('utf-8', errors='ignore')
+                    body = _decode_body(data)
                 else:
                     # If no plain text part, fall back to the HTML part and parse it.
                     html_part = next((p for p in payload['parts'] if p.get('mimeType') == 'text/html'), None)
-                    if html_part and 'data' in html_part['body']:
+                    if html_part and 'data' in html_part.get('body', {}):
                         data = html_part['body'].get('data', '')
-                        html_content = base64.urlsafe_b64decode(data).decode('utf-8', errors='ignore')
-                        soup = BeautifulSoup(html_content, "html.parser")
-                        body = soup.get_text(separator='\n')
-            elif 'data' in payload['body']:
-                # This handles simple, non-multipart emails.
+                        html_content = _decode_body(data)
+                        body = _html_to_text(html_content)
+            elif 'data' in payload.get('body', {}):
+                # This handles simple, non-multipart emails, which may be HTML-only.
                 data = payload['body'].get('data', '')
-                body = base64.urlsafe_b64decode(data).decode('utf-8', errors='ignore')
+                body = _decode_body(data)
+                if payload.get('mimeType') == 'text/html':
+                    body = _html_to_text(body)
 
             if body.strip():
-                parsed_emails.append({"id": msg['id'], "sender": sender, "subject": subject, "body": body, "headers": headers})
+                parsed_emails.append({"id": response['id'], "sender": sender, "subject": subject, "body": body, "headers": headers})
+
+        # Fetch full messages in chunks of BATCH_SIZE instead of one request per email.
+        for i in range(0, len(messages), BATCH_SIZE):
+            message_chunk = messages[i:i + BATCH_SIZE]
+            batch = service.new_batch_http_request(callback=callback)
+            for message_info in message_chunk:
+                batch.add(service.users().messages().get(userId='me', id=message_info['id'], format='full', fields=_MESSAGE_FIELDS), request_id=message_info['id'])
+            batch.execute()
 
+        # Batch responses can arrive in any order, so restore the order returned by list().
+        parsed_emails.sort(key=lambda e: message_order.get(e['id'], len(message_order)))
         return parsed_emails
-    except Exception as e:
-        print(f"An error occurred while fetching and parsing emails: {e}")
+    except Exception:
+        logger.exception("An error occurred while fetching and parsing emails")
         return []
\ No newline at end of file
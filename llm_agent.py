@@ -1,11 +1,27 @@
 # llm_agent.py
 
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import TypedDict
 import google.generativeai as genai
-import json
 import re
+import threading
 import time
 from dotenv import load_dotenv
 import os
+from google.api_core.exceptions import ResourceExhausted
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential_jitter
+from llm_cache import get_cached, set_cached
+
+# orjson parses model responses faster than the standard library; fall back if it isn't installed.
+try:
+    import orjson as _json
+except ImportError:
+    import json as _json
+
+logger = logging.getLogger(__name__)
 
 # --- Configuration ---
 # Load environment variables from a .env file for security.
@@ -15,92 +31,626 @@ GOOGLE_API_KEY = os.getenv("API_KEY")
 
 genai.configure(api_key=GOOGLE_API_KEY)
 
-def analyze_email_with_llm(email_body):
+# The Gemini model used for all email analysis.
+MODEL_NAME = 'gemini-1.5-flash'
+# Created once and shared by every call instead of being rebuilt per email.
+_MODEL = genai.GenerativeModel(MODEL_NAME)
+# Finding an unsubscribe URL is a simple extraction task, so it uses a smaller,
+# faster model by default.
+UNSUB_MODEL_NAME = os.getenv("INBOXIQ_UNSUB_MODEL", "gemini-1.5-flash-8b")
+_UNSUB_MODEL = genai.GenerativeModel(UNSUB_MODEL_NAME)
+# Cache namespaces include the model and a prompt version, so changing either
+# invalidates previously cached answers. Analyses are keyed by the raw email body,
+# so the version must be bumped whenever the analysis prompt or the body
+# preprocessing changes.
+ANALYZE_CACHE_NS = f"{MODEL_NAME}:analyze_v2"
+UNSUB_CACHE_NS = f"{UNSUB_MODEL_NAME}:unsub_v1"
+# Newsletters from one sender share a template, so an email whose body embedding
+# is this similar (cosine) to an already analyzed one reuses its category.
+EMBEDDING_MODEL = 'models/text-embedding-004'
+SEMANTIC_CACHE_THRESHOLD = 0.92
+SEMANTIC_CACHE_MAX_ENTRIES = 2048
+# The only categories reused this way, with the fixed priority they are given (as
+# for newsletters recognized by header). Priority is never copied from a similar
+# email: it orders the Priority Inbox and Cleanup lists, and templated emails
+# such as shipping notices can differ in urgency.
+SEMANTIC_CACHE_PRIORITIES = {'Newsletter/Promotional': 2, 'Spam': 1}
+# Unsubscribe links in the body: a URL whose path mentions unsubscribing, or a URL
+# directly attached to unsubscribe wording. Bodies reach this module as text, with
+# HTML links rendered by email_fetcher as 'Unsubscribe (https://...)'; plain-text
+# parts usually read 'unsubscribe: https://...' or 'unsubscribe <https://...>'.
+# Wording separated from a URL by other text ('unsubscribe anytime. See https://...')
+# does not count, since that URL is usually some other link.
+_UNSUB_URL_RE = re.compile(r'https?://[^\s<>"\']*(?:unsubscribe|opt[-_]?out)[^\s<>"\']*', re.IGNORECASE)
+_UNSUB_TEXT_LINK_RE = re.compile(r'(?:unsubscribe|opt[- ]?out|manage\s+(?:your\s+)?preferences)\s*[:(<]\s*(https?://[^\s)>]+)', re.IGNORECASE)
+# Body wording that suggests a mailing-list email worth an LLM unsubscribe scan.
+_BULK_BODY_RE = re.compile(r'\bunsubscribe\b|\bopt[- ]?out\b', re.IGNORECASE)
+# SpamAssassin-style score at or above which an email is treated as bulk mail.
+BULK_SPAM_SCORE = 5.0
+# Keyword rules that classify obvious emails without an LLM call.
+_RECEIPT_RE = re.compile(r'\b(?:receipt|invoice)\b|\border\s+#', re.IGNORECASE)
+_URGENT_RE = re.compile(r'\b(?:urgent|asap|action\s+required)\b', re.IGNORECASE)
+# Quoted lines ('> ...') repeat earlier messages of a reply chain.
+_QUOTED_LINE_RE = re.compile(r'(?m)^[ \t]*>.*$')
+_WHITESPACE_RE = re.compile(r'\s+')
+# Gmail's plain-text rendering of an inline image, e.g. '[image: photo.png]'.
+_IMAGE_PLACEHOLDER_RE = re.compile(r'\[image:[^\]]*\]')
+# Any character other than whitespace and ASCII punctuation (letters, digits,
+# emoji) counts as text.
+_TEXT_CHAR_RE = re.compile(r'[^\s!-/:-@\[-`{-~]')
+# The analysis given to emails without any text, which the model can't classify.
+_EMPTY_BODY_ANALYSIS = {'category': 'Notification', 'priority': 1, 'summary': '(empty or attachment-only)'}
+_HTTP_RE = re.compile(r'https?:', re.IGNORECASE)
+# Emails carrying one-time codes are unique per message, so caching them only wastes space.
+_DYNAMIC_CONTENT_RE = re.compile(r'\b(?:otp|one[- ]time (?:code|password|passcode)|verification code|security code)\b', re.IGNORECASE)
+
+# Caps how many Gemini requests are in flight at once across all async callers.
+# A concurrency cap (not just a per-minute limit) keeps bursts from tripping rate limits.
+MAX_CONCURRENT_REQUESTS = int(os.getenv("INBOXIQ_MAX_CONCURRENT", "8"))
+_SEM = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+
+# Worker threads used to run blocking Gemini calls concurrently when the installed
+# google-generativeai version has no async API. LLM calls are I/O-bound, so the GIL
+# is released while each thread waits on the network.
+_LLM_EXECUTOR = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS)
+
+class RateLimiter:
+    """
+    Spaces Gemini requests evenly to stay within a requests-per-minute budget.
+
+    Each caller reserves the next free slot and waits only until then, so calls
+    proceed immediately while under the limit instead of always sleeping.
+    """
+
+    def __init__(self, rpm):
+        self.interval = 60.0 / rpm
+        self.next = 0.0
+        self.lock = threading.Lock()
+
+    def _reserve(self):
+        """Claims the next request slot and returns how long to wait for it."""
+        with self.lock:
+            now = time.monotonic()
+            wait = max(0.0, self.next - now)
+            self.next = max(self.next, now) + self.interval
+        return wait
+
+    def acquire(self):
+        """Blocks the current thread until a request may be sent."""
+        time.sleep(self._reserve())
+
+    async def acquire_async(self):
+        """Waits, without blocking the event loop, until a request may be sent."""
+        await asyncio.sleep(self._reserve())
+
+# The Gemini requests-per-minute budget shared by every call in the process.
+REQUESTS_PER_MINUTE = int(os.getenv("INBOXIQ_RPM", "60"))
+_LIMITER = RateLimiter(REQUESTS_PER_MINUTE)
+
+# Retries a rate-limited (HTTP 429) call with randomized exponential backoff.
+_retry_on_rate_limit = retry(
+    wait=wait_exponential_jitter(initial=1, max=30),
+    stop=stop_after_attempt(5),
+    retry=retry_if_exception_type(ResourceExhausted),
+    reraise=True
+)
+
+@_retry_on_rate_limit
+async def _generate_content_async(model, prompt, generation_config=None):
+    """
+    Awaits a Gemini completion, preferring the native async client.
+
+    At most MAX_CONCURRENT_REQUESTS calls run at once, paced by the shared rate
+    limiter and retried on 429s. Falls back to running the synchronous
+    `generate_content` on a bounded thread pool if `generate_content_async` is
+    unavailable.
+    """
+    async with _SEM:
+        await _LIMITER.acquire_async()
+        if hasattr(model, 'generate_content_async'):
+            return await model.generate_content_async(prompt, generation_config=generation_config)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_LLM_EXECUTOR, partial(model.generate_content, prompt, generation_config=generation_config))
+
+# The number of emails sent to Gemini in a single analysis prompt. Larger batches
+# amortize the per-request round-trip; smaller ones keep latency and the size of
+# a failed batch low.
+ANALYSIS_BATCH_SIZE = 10
+# Per-email UTF-8 byte budget inside a batched prompt. Batched bodies are cut by
+# bytes, not tokens: counting tokens would cost an extra request per email.
+ANALYSIS_BODY_BYTE_LIMIT = 1000
+# UTF-8 byte budget for prompts about a single email.
+BODY_BYTE_LIMIT = 4000
+
+def _is_cacheable(email_body):
+    """Returns False for emails with dynamic content such as one-time codes."""
+    return not _DYNAMIC_CONTENT_RE.search(email_body)
+
+async def _cached_generate_async(model, prompt, cache_ns, use_cache=True, generation_config=None):
+    """
+    Returns the model's response text for a prompt, using the on-disk cache.
+
+    The cache key is a SHA-256 of the namespace and the full prompt; the text is
+    stored only after a successful call.
+    """
+    if use_cache:
+        cached_text = get_cached(cache_ns, prompt)
+        if cached_text is not None:
+            return cached_text
+    response = await _generate_content_async(model, prompt, generation_config)
+    if use_cache:
+        set_cached(cache_ns, prompt, response.text)
+    return response.text
+
+# Response schemas for Gemini's structured-output mode. The server enforces them,
+# so responses are valid JSON without any prompt instructions about formatting.
+class EmailAnalysis(TypedDict):
+    index: int
+    category: str
+    priority: int
+    summary: str
+
+_ANALYSIS_GENERATION_CONFIG = {"response_mime_type": "application/json", "response_schema": list[EmailAnalysis]}
+
+# The invariant instructions of each prompt, built once; only the email text is appended per call.
+_ANALYZE_PROMPT_PREFIX = """Analyze each of the numbered emails below.
+    Return one object per email, in the same order, with these fields:
+    1. 'index': The number of the email it describes.
+    2. 'category': Choose one of the following strings: 'Newsletter/Promotional', 'Personal Conversation', 'Urgent/Action Required', 'Transaction/Receipt', 'Notification', 'Spam'.
+    3. 'priority': An integer from 1 (lowest, can be ignored) to 10 (highest, needs immediate attention).
+    4. 'summary': A concise, one-sentence summary of the email's main point or call to action.
+    Here are the emails:
+    ---
+    """
+_UNSUB_PROMPT_PREFIX = """Analyze the following email content. Your only job is to find the unsubscribe URL.
+    Look for phrases like 'unsubscribe', 'manage your preferences', or 'opt-out'.
+    Return ONLY the full URL. If you cannot find a URL, return the single word 'None'.
+    Here is the email body:
+    ---
+    """
+
+def _truncate_utf8(text, max_bytes):
+    """
+    Truncates text to at most `max_bytes` of UTF-8, so the prompt size is bounded
+    regardless of how many bytes each character takes.
+    """
+    return text.encode('utf-8')[:max_bytes].decode('utf-8', 'ignore')
+
+def _clean_body(email_body):
+    """
+    Reduces an email body to the text worth sending to the model.
+
+    Bodies arrive as text (email_fetcher already converts HTML, keeping links as
+    'text (url)'), so this only removes quoted '>' reply lines and collapses runs
+    of whitespace, so the truncation budget goes to the message itself.
+    """
+    email_body = _QUOTED_LINE_RE.sub('', email_body)
+    return _WHITESPACE_RE.sub(' ', email_body).strip()
+
+def truncate_body(email_body):
+    """
+    Truncates an email body to the largest slice any prompt uses.
+
+    The body is cleaned first. Callers that run several LLM helpers on the same
+    email can compute this once and pass it as `truncated_body` so the body is
+    not truncated for each call.
+    """
+    return _truncate_utf8(_clean_body(email_body), BODY_BYTE_LIMIT)
+
+def _build_batch_analysis_prompt(email_bodies):
+    """Builds one prompt that asks for an analysis of every numbered email body."""
+    numbered_bodies = "\n".join(f"[{i}]\n{_truncate_utf8(_clean_body(body), ANALYSIS_BODY_BYTE_LIMIT)}" for i, body in enumerate(email_bodies))
+    return f"{_ANALYZE_PROMPT_PREFIX}{numbered_bodies}"
+
+def _parse_batch_analysis_response(response, expected_count):
+    """
+    Parses the model's JSON array into a list of analysis dictionaries.
+
+    The list is aligned with the emails in the prompt; entries the model left
+    out or returned malformed are None.
+    """
+    items = _json.loads(response.text)
+    if isinstance(items, dict):
+        items = [items]
+
+    results = [None] * expected_count
+    for position, item in enumerate(items):
+        if not isinstance(item, dict) or 'priority' not in item:
+            continue
+        index = item.pop('index', position)
+        if isinstance(index, int) and 0 <= index < expected_count:
+            results[index] = item
+    return results
+
+def _has_no_text(email_body):
+    """
+    Returns True if the body has no text beyond whitespace, punctuation, and
+    inline-image placeholders, as in attachment- or image-only emails.
+
+    Short personal replies ("Sounds good!") still have text and go to the LLM.
+    """
+    return not _TEXT_CHAR_RE.search(_IMAGE_PLACEHOLDER_RE.sub('', email_body))
+
+def _cheap_classify(email_headers, email_body):
+    """
+    Classifies obvious emails with header and keyword rules, without an LLM call.
+
+    Args:
+        email_headers (list): A list of header dictionaries from the Gmail API, or None.
+        email_body (str): The text content of the email.
+
+    Returns:
+        dict: A pre-filled analysis with 'category', 'priority', and 'summary',
+              or None if the email needs the LLM.
+    """
+    if _has_no_text(email_body):
+        return dict(_EMPTY_BODY_ANALYSIS)
+    if 'list-unsubscribe' in _headers_dict(email_headers):
+        category, priority = 'Newsletter/Promotional', 2
+    elif _RECEIPT_RE.search(email_body):
+        category, priority = 'Transaction/Receipt', 3
+    elif _URGENT_RE.search(email_body):
+        category, priority = 'Urgent/Action Required', 8
+    else:
+        return None
+    return {'category': category, 'priority': priority, 'summary': _first_sentence(email_body)}
+
+def _first_sentence(email_body):
+    """Returns the first sentence of the body, used as a summary without an LLM call."""
+    first_sentence = re.split(r'(?<=[.!?])\s', email_body.strip(), maxsplit=1)[0]
+    return ' '.join(first_sentence.split())[:200]
+
+class SemanticCache:
+    """
+    Remembers email categories by body embedding, so near-identical emails
+    (such as the same newsletter template sent to different names) skip the model.
+
+    Vectors are stored unit-length, so cosine similarity is a dot product; a flat
+    scan over a few thousand entries takes well under a millisecond with numpy.
+    """
+
+    def __init__(self, threshold, max_entries):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        # A (max_entries, dim) ring buffer, allocated on the first add once the
+        # embedding size is known; `count` rows are filled and `next` is overwritten next.
+        self.vectors = None
+        self.entries = [None] * max_entries
+        self.count = 0
+        self.next = 0
+        self.lock = threading.Lock()
+
+    def lookup(self, vector):
+        """Returns the entry most similar to `vector`, or None if none passes the threshold."""
+        with self.lock:
+            if not self.count:
+                return None
+            similarities = self.vectors[:self.count] @ vector
+            best = int(similarities.argmax())
+            if similarities[best] > self.threshold:
+                return self.entries[best]
+        return None
+
+    def add(self, vector, entry):
+        """Stores an entry under its unit-length vector, overwriting the oldest when full."""
+        import numpy as np
+
+        with self.lock:
+            if self.vectors is None:
+                self.vectors = np.zeros((self.max_entries, len(vector)), dtype=np.float32)
+            self.vectors[self.next] = vector
+            self.entries[self.next] = entry
+            self.next = (self.next + 1) % self.max_entries
+            self.count = min(self.count + 1, self.max_entries)
+
+_SEMANTIC_CACHE = SemanticCache(SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_MAX_ENTRIES)
+
+@_retry_on_rate_limit
+def _embed_content(texts):
+    """Embeds texts in one Gemini request, paced by the shared rate limiter and retried on 429s."""
+    _LIMITER.acquire()
+    return genai.embed_content(model=EMBEDDING_MODEL, content=texts, task_type='semantic_similarity')
+
+def _embed_bodies(email_bodies):
+    """
+    Embeds the cleaned bodies in one request.
+
+    Returns:
+        numpy.ndarray: One unit-length row per body, or None if embedding fails.
+    """
+    import numpy as np
+
+    try:
+        texts = [_truncate_utf8(_clean_body(body), BODY_BYTE_LIMIT) for body in email_bodies]
+        result = _embed_content(texts)
+        vectors = np.asarray(result['embedding'], dtype=np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    except Exception:
+        logger.exception("Embedding email bodies failed")
+        return None
+
+def _semantic_lookup(email_bodies, results, pending):
+    """
+    Fills in pending emails that are near-duplicates of an analyzed email.
+
+    Only the category is reused, and only for SEMANTIC_CACHE_PRIORITIES
+    categories, which also set the priority. The summary is taken from the
+    email's own first sentence, since it differs between near-duplicates.
+    Emails with dynamic content (see `_is_cacheable`) are never looked up.
+
+    Returns the indexes that still need an LLM call and a dict mapping the
+    cacheable ones to their embedding, for `_store_batch_results` to remember.
+    """
+    candidates = [i for i in pending if _is_cacheable(email_bodies[i])]
+    if not candidates:
+        return pending, {}
+    vectors = _embed_bodies([email_bodies[i] for i in candidates])
+    if vectors is None:
+        return pending, {}
+    embeddings = {}
+    for index, vector in zip(candidates, vectors):
+        category = _SEMANTIC_CACHE.lookup(vector)
+        if category:
+            results[index] = {'category': category, 'priority': SEMANTIC_CACHE_PRIORITIES[category],
+                              'summary': _first_sentence(email_bodies[index])}
+        else:
+            embeddings[index] = vector
+    return [i for i in pending if results[i] is None], embeddings
+
+def _split_cached(email_bodies, email_headers=None):
+    """
+    Resolves each email without the LLM where possible, first with the cheap
+    rule-based classifier and then from the cache.
+
+    Returns the (partially filled) results list and the indexes that still need
+    an LLM call.
+    """
+    results = []
+    for i, body in enumerate(email_bodies):
+        result = _cheap_classify(email_headers[i] if email_headers else None, body)
+        if result is None and _is_cacheable(body):
+            result = get_cached(ANALYZE_CACHE_NS, body)
+        results.append(result)
+    pending = [i for i, result in enumerate(results) if result is None]
+    return results, pending
+
+def _resolve_without_llm(email_bodies, email_headers=None):
+    """
+    Runs every pre-LLM step of the analysis pipeline: the rule-based classifier,
+    the exact cache, and then the near-duplicate (semantic) cache.
+
+    This blocks on SQLite and the embedding request, so async callers run it on
+    the LLM thread pool.
+
+    Returns the (partially filled) results list, the indexes that still need an
+    LLM call, and the embeddings of those emails.
+    """
+    results, pending = _split_cached(email_bodies, email_headers)
+    if not pending:
+        return results, pending, {}
+    pending, embeddings = _semantic_lookup(email_bodies, results, pending)
+    return results, pending, embeddings
+
+def _store_batch_results(email_bodies, results, batch_indexes, batch_results, embeddings):
+    """Copies a batch's analyses into the overall results and caches the successes."""
+    for index, analysis in zip(batch_indexes, batch_results):
+        results[index] = analysis
+        if analysis is None:
+            continue
+        if _is_cacheable(email_bodies[index]):
+            set_cached(ANALYZE_CACHE_NS, email_bodies[index], analysis)
+        if index in embeddings and analysis.get('category') in SEMANTIC_CACHE_PRIORITIES:
+            _SEMANTIC_CACHE.add(embeddings[index], analysis['category'])
+
+async def analyze_emails_with_llm_async(email_bodies, email_headers=None, truncated_bodies=None):
+    """
+    Analyzes several emails with the Gemini model, several emails per request.
+
+    Emails that simple header/keyword rules can classify, or that are nearly
+    identical to an already analyzed email, skip the model. The rest are grouped
+    into batches of ANALYSIS_BATCH_SIZE, each sent as a single prompt, and all
+    batches are sent concurrently with `asyncio.gather`.
+
+    Args:
+        email_bodies (list): The text content of each email.
+        email_headers (list, optional): The Gmail API header list of each email,
+                                        aligned with `email_bodies`.
+        truncated_bodies (list, optional): `truncate_body` of each email, if the
+                                           caller already computed them.
+
+    Returns:
+        list: One dictionary per email containing 'category', 'priority', and
+              'summary', or None where the analysis failed.
+    """
+    loop = asyncio.get_running_loop()
+    results, pending, embeddings = await loop.run_in_executor(_LLM_EXECUTOR, _resolve_without_llm, email_bodies, email_headers)
+    if not pending:
+        return results
+
+    prompt_bodies = truncated_bodies or email_bodies
+
+    async def analyze_batch(batch_indexes):
+        prompt = _build_batch_analysis_prompt([prompt_bodies[j] for j in batch_indexes])
+        response = None
+        try:
+            response = await _generate_content_async(_MODEL, prompt, _ANALYSIS_GENERATION_CONFIG)
+            batch_results = _parse_batch_analysis_response(response, len(batch_indexes))
+            _store_batch_results(email_bodies, results, batch_indexes, batch_results, embeddings)
+        except Exception:
+            logger.exception("Gemini batch analysis failed")
+            # Log the raw response from the model for easier debugging.
+            if response is not None:
+                logger.debug("Raw model response: %r", getattr(response, 'text', ''))
+
+    await asyncio.gather(*(analyze_batch(pending[i:i + ANALYSIS_BATCH_SIZE]) for i in range(0, len(pending), ANALYSIS_BATCH_SIZE)))
+    return results
+
+async def analyze_email_with_llm_async(email_body, email_headers=None, truncated_body=None):
     """
     Analyzes email content using the Gemini model to determine its category,
     priority, and a brief summary.
 
+    This is a thin wrapper around `analyze_emails_with_llm_async` for a single email.
+
     Args:
         email_body (str): The text content of the email.
+        email_headers (list, optional): A list of header dictionaries from the Gmail API.
+        truncated_body (str, optional): `truncate_body(email_body)`, if the caller
+                                        already computed it.
 
     Returns:
         dict: A dictionary containing 'category', 'priority', and 'summary',
               or None if the analysis fails.
     """
-    model = genai.GenerativeModel('gemini-1.5-flash')
-    prompt = """Analyze the following email content.
-    Respond in a strict JSON format. Do not include any other text or formatting like ```json.
-    The JSON object must have exactly three keys:
-    1. 'category': Choose one of the following strings: 'Newsletter/Promotional', 'Personal Conversation', 'Urgent/Action Required', 'Transaction/Receipt', 'Notification', 'Spam'.
-    2. 'priority': An integer from 1 (lowest, can be ignored) to 10 (highest, needs immediate attention).
-    3. 'summary': A concise, one-sentence summary of the email's main point or call to action.
-    Here is the email body:
-    ---
-    {}
-    """.format(email_body[:4000]) # Truncate body to manage token usage and context size.
+    truncated_bodies = [truncated_body] if truncated_body is not None else None
+    return (await analyze_emails_with_llm_async([email_body], [email_headers] if email_headers else None, truncated_bodies))[0]
+
+def _headers_dict(email_headers):
+    """Maps lowercased header names to values so each header lookup is O(1)."""
+    return {h['name'].lower(): h['value'] for h in email_headers or []}
+
+def _iter_header_uris(header_value):
+    """
+    Yields each URI in an RFC 2369 header value such as '<mailto:x>, <https://y>'.
 
-    # Add a short delay to avoid hitting API rate limits.
-    time.sleep(1)
+    Scans for angle-bracketed tokens directly rather than splitting on commas,
+    which may also appear inside a URI.
+    """
+    start = header_value.find('<')
+    while start != -1:
+        end = header_value.find('>', start + 1)
+        if end == -1:
+            return
+        yield header_value[start + 1:end].strip()
+        start = header_value.find('<', end + 1)
 
+def _find_header_unsubscribe_link(headers_dict):
+    """
+    Returns the HTTP(S) link from the 'List-Unsubscribe' header, or None.
+
+    When the sender supports RFC 8058 one-click unsubscribe
+    ('List-Unsubscribe-Post: List-Unsubscribe=One-Click'), an HTTPS link is preferred.
+    """
     try:
-        response = model.generate_content(prompt)
-        # Clean up the response to ensure it's a valid JSON string.
-        clean_json_string = response.text.strip().replace('```json', '').replace('```', '')
-        analysis_result = json.loads(clean_json_string)
-        return analysis_result
-    except Exception as e:
-        print(f"An error occurred while analyzing the email with Gemini: {e}")
-        # Log the raw response from the model for easier debugging.
-        if 'response' in locals():
-            print(f"--- Raw Model Response --- \n{response.text}")
-        return None
+        list_unsub_header = headers_dict.get('list-unsubscribe')
+        if list_unsub_header:
+            http_links = [uri for uri in _iter_header_uris(list_unsub_header) if uri.startswith(('http://', 'https://'))]
+            if http_links:
+                link = http_links[0]
+                if 'one-click' in headers_dict.get('list-unsubscribe-post', '').lower():
+                    link = next((uri for uri in http_links if uri.startswith('https://')), link)
+                logger.debug("Found unsubscribe link in header: %s", link)
+                return link
+    except Exception:
+        logger.exception("Error parsing List-Unsubscribe header")
+    return None
+
+def _find_body_unsubscribe_link(email_body):
+    """Returns an unsubscribe link found in the body by regex, or None."""
+    # A URL that itself says 'unsubscribe' is the strongest signal, so try it first.
+    plain_link = _UNSUB_URL_RE.search(email_body)
+    if plain_link:
+        # Drop sentence punctuation that directly follows the URL in plain text.
+        return plain_link.group(0).rstrip('.,;:!?)')
+    text_link = _UNSUB_TEXT_LINK_RE.search(email_body)
+    if text_link:
+        return text_link.group(1).rstrip('.,;:!?')
+    return None
+
+def _looks_like_bulk(headers_dict, email_body):
+    """
+    Returns True if an email looks like bulk/list mail that may hide an
+    unsubscribe link, so personal emails don't pay for an LLM scan.
+    """
+    if headers_dict.get('precedence', '').strip().lower() in ('bulk', 'list', 'junk'):
+        return True
+    if 'list-id' in headers_dict:
+        return True
+    try:
+        if float(headers_dict.get('x-spam-score', '')) >= BULK_SPAM_SCORE:
+            return True
+    except ValueError:
+        pass
+    return _BULK_BODY_RE.search(email_body) is not None
+
+def _build_unsubscribe_prompt(email_body, truncated_body=None):
+    """Builds the prompt asking the model to find an unsubscribe URL in the body."""
+    # Truncate body to manage token usage, unless the caller already did.
+    if truncated_body is None:
+        truncated_body = truncate_body(email_body)
+    return f"{_UNSUB_PROMPT_PREFIX}{truncated_body}"
+
+def _parse_unsubscribe_response(response_text):
+    """Returns the URL from the model's answer, or None if it is not a link."""
+    link = response_text.strip()
+    # Validate that the response is a URL.
+    if link and link.lower().startswith('http'):
+        return link
+    return None
 
-def find_unsubscribe_link(email_headers, email_body):
+def _find_unsubscribe_link_without_llm(headers_dict, email_body):
     """
-    Finds an unsubscribe link in an email using a two-step process.
+    Runs every pre-LLM step of the unsubscribe link search.
+
+    Returns:
+        tuple: The link found (or None), and whether the LLM should still scan the body.
+    """
+    # First, try the most reliable method: the 'List-Unsubscribe' header.
+    header_link = _find_header_unsubscribe_link(headers_dict)
+    if header_link:
+        return header_link, False
+
+    # Without any link in the body, neither the regex nor the LLM can find one.
+    if not _HTTP_RE.search(email_body):
+        return None, False
+
+    # Next, look for an unsubscribe link in the body without calling the LLM.
+    body_link = _find_body_unsubscribe_link(email_body)
+    if body_link:
+        return body_link, False
+
+    # Personal (non-bulk) emails legitimately have no unsubscribe link.
+    return None, _looks_like_bulk(headers_dict, email_body)
+
+async def find_unsubscribe_link_async(email_headers, email_body, headers_dict=None, truncated_body=None):
+    """
+    Finds an unsubscribe link in an email using a three-step process.
 
     1. It first checks for a 'List-Unsubscribe' header, which is the most reliable method.
-    2. If not found, it falls back to using an LLM to scan the email body for a link.
+    2. If not found, it searches the body for an unsubscribe link with a regex.
+    3. Only if both fail, and the email looks like bulk mail with a link somewhere
+       in its body, does it fall back to using an LLM to scan the email body.
+
+    The LLM call uses `generate_content_async`, so many emails can be scanned concurrently.
 
     Args:
         email_headers (list): A list of header dictionaries from the Gmail API.
         email_body (str): The text content of the email.
+        headers_dict (dict, optional): Lowercased header names mapped to values, if
+                                       the caller already built one for this email.
+        truncated_body (str, optional): `truncate_body(email_body)`, if the caller
+                                        already computed it.
 
     Returns:
         str: The unsubscribe URL, or None if no link is found.
     """
-    # First, try the most reliable method: the 'List-Unsubscribe' header.
-    try:
-        list_unsub_header = next((h['value'] for h in email_headers if h['name'].lower() == 'list-unsubscribe'), None)
-        if list_unsub_header:
-            # Extract the first HTTP(S) link from the header value.
-            http_link = re.search(r'<(https?://[^>]+)>', list_unsub_header)
-            if http_link:
-                print(f"Found unsubscribe link in header: {http_link.group(1)}")
-                return http_link.group(1)
-    except Exception as e:
-        print(f"Error parsing List-Unsubscribe header: {e}")
-
-    # If header fails, fall back to an LLM scan of the email body.
-    print("Header link not found, falling back to LLM body scan...")
-    model = genai.GenerativeModel('gemini-1.5-flash')
-    prompt = """Analyze the following email content. Your only job is to find the unsubscribe URL.
-    Look for phrases like 'unsubscribe', 'manage your preferences', or 'opt-out'.
-    Return ONLY the full URL. If you cannot find a URL, return the single word 'None'.
-    Here is the email body:
-    ---
-    {}
-    """.format(email_body[:4000]) # Truncate body to manage token usage.
+    if headers_dict is None:
+        headers_dict = _headers_dict(email_headers)
+
+    link, needs_llm = _find_unsubscribe_link_without_llm(headers_dict, email_body)
+    if not needs_llm:
+        return link
 
-    time.sleep(1) # Respect API rate limits.
+    # Fall back to an LLM scan of the email body.
+    logger.debug("Header link not found, falling back to LLM body scan...")
+    prompt = _build_unsubscribe_prompt(email_body, truncated_body)
 
+    response_text = None
     try:
-        response = model.generate_content(prompt)
-        link = response.text.strip()
-        # Validate that the response is a URL.
-        if link and link.lower().startswith('http'):
-            return link
+        response_text = await _cached_generate_async(_UNSUB_MODEL, prompt, UNSUB_CACHE_NS, use_cache=_is_cacheable(email_body))
+        return _parse_unsubscribe_response(response_text)
+    except Exception:
+        logger.exception("LLM scan for unsubscribe link failed")
+        if response_text is not None:
+            logger.debug("Raw model response: %r", response_text)
         return None
-    except Exception as e:
-        print(f"LLM scan for unsubscribe link failed: {e}")
-        return None
\ No newline at end of file
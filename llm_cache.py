@@ -0,0 +1,84 @@
+# llm_cache.py
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+# The SQLite file that persists LLM results between app runs.
+CACHE_PATH = os.path.join(os.path.expanduser('~'), '.inboxiq', 'llm_cache.db')
+# How long a cached LLM result stays valid (7 days).
+CACHE_TTL_SECONDS = 7 * 86400
+
+_conn = None
+_lock = threading.Lock()
+
+def _get_connection():
+    """
+    Lazily opens the cache database and creates its table on first use.
+
+    Expired entries are deleted when the database is opened, once per process,
+    so the file doesn't keep growing with results that can never be read again.
+    The connection is shared across Gradio worker threads, so all access is
+    serialized through a module-level lock.
+    """
+    global _conn
+    if _conn is None:
+        os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+        _conn = sqlite3.connect(CACHE_PATH, check_same_thread=False)
+        _conn.execute("CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)")
+        _conn.execute("DELETE FROM llm_cache WHERE expires_at < ?", (time.time(),))
+        _conn.commit()
+    return _conn
+
+def make_key(namespace, text):
+    """Returns a SHA-256 cache key for the given text within a namespace."""
+    return hashlib.sha256(f"{namespace}:{text}".encode('utf-8')).hexdigest()
+
+def get_cached(namespace, text):
+    """
+    Looks up a previously stored LLM result.
+
+    Args:
+        namespace (str): Identifies the model and prompt that produced the result
+                         (e.g., 'gemini-1.5-flash:analyze_v2').
+        text (str): The input the result was computed from, such as the email body or prompt.
+
+    Returns:
+        The stored JSON-compatible value, or None on a miss, expiry, or error.
+    """
+    try:
+        with _lock:
+            row = _get_connection().execute("SELECT value, expires_at FROM llm_cache WHERE key = ?", (make_key(namespace, text),)).fetchone()
+        if not row or row[1] < time.time():
+            return None
+        return json.loads(row[0])
+    except Exception:
+        logger.exception("Error reading from LLM cache")
+        return None
+
+def set_cached(namespace, text, value, ttl=CACHE_TTL_SECONDS):
+    """
+    Stores an LLM result so identical inputs can skip the model call next time.
+
+    Args:
+        namespace (str): Identifies the model and prompt that produced the result
+                         (e.g., 'gemini-1.5-flash:analyze_v2').
+        text (str): The input the result was computed from, such as the email body or prompt.
+        value: A JSON-serializable result to store.
+        ttl (int): Seconds until the entry expires.
+    """
+    try:
+        with _lock:
+            conn = _get_connection()
+            conn.execute("INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                         (make_key(namespace, text), json.dumps(value), time.time() + ttl))
+            conn.commit()
+    except Exception:
+        logger.exception("Error writing to LLM cache")